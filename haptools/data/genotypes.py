@@ -1,11 +1,16 @@
 from __future__ import annotations
+import os
 import re
 import gc
+import sys
 from csv import reader
 from pathlib import Path
 from typing import Iterator
-from logging import getLogger, Logger
+from contextlib import closing
+from tempfile import mkstemp
+from logging import getLogger, Logger, ERROR
 from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import numpy.typing as npt
@@ -15,6 +20,91 @@ from pysam import VariantFile, TabixFile
 from .data import Data
 
 
+def _read_chunk(
+    genotypes: Genotypes,
+    region: str = None,
+    keep_from: int = 0,
+    samples: list[str] = None,
+    variants: set[str] = None,
+) -> Genotypes:
+    """
+    Read genotypes from a sub-region of a file
+
+    This is a helper function for :py:meth:`~.Genotypes._read_parallel`. It's defined
+    at the module level so that it can be pickled and sent to other processes.
+
+    Parameters
+    ----------
+    genotypes : Genotypes
+        An empty Genotypes object into which the genotypes should be read
+    region : str, optional
+        See documentation for :py:meth:`~.Genotypes.read`
+    keep_from : int, optional
+        Ignore any variants with a position less than this value
+
+        These variants overlap the sub-region but start in the one before it
+    samples : list[str], optional
+        See documentation for :py:meth:`~.Genotypes.read`
+    variants : set[str], optional
+        See documentation for :py:meth:`~.Genotypes.read`
+
+    Returns
+    -------
+    Genotypes
+        The Genotypes object with the data loaded into its properties, except for the
+        samples
+    """
+    # empty sub-regions are expected, so don't warn about each of them
+    log_level = genotypes.log.level
+    genotypes.log.setLevel(ERROR)
+    try:
+        genotypes.read(region, samples, variants)
+    finally:
+        genotypes.log.setLevel(log_level)
+    if keep_from:
+        keep = genotypes.variants["pos"] >= keep_from
+        genotypes.variants = genotypes.variants[keep]
+        genotypes.data = genotypes.data[:, keep]
+    # the parent process already has the sample IDs, so there's no need to pickle
+    # another copy of them for every chunk
+    genotypes.samples = tuple()
+    return genotypes
+
+
+def _save_atomically(path: Path, save, *args, **kwargs):
+    """
+    Save an array to a file by writing it to a unique temporary file and then
+    renaming the temporary file into place
+
+    This is a helper function for :py:meth:`~.Genotypes._write_cache`. Readers never
+    see a partially written file, concurrent writers never clobber each other's
+    temporary files, and a file that is memory-mapped elsewhere is replaced rather
+    than overwritten.
+
+    Parameters
+    ----------
+    path : Path
+        The path to the file that should be written
+    save : Callable
+        A function like np.save or np.savez that accepts a file object as its first
+        argument
+    *args, **kwargs
+        Any other arguments to pass to the save function
+    """
+    tmp_fd, tmp_name = mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        # mkstemp only lets the owner read the file, so apply the usual permissions
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_fd, 0o666 & ~umask)
+        with os.fdopen(tmp_fd, "wb") as tmp_file:
+            save(tmp_file, *args, **kwargs)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
 class Genotypes(Data):
     """
     A class for processing genotypes from a file
@@ -41,6 +131,9 @@ class Genotypes(Data):
         Sample index; maps samples to indices in self.samples
     _var_idx : dict[str, int]
         Variant index; maps variant IDs to indices in self.variants
+    _block_size : int
+        The approximate number of genotypes to check at once when scanning the data
+        for errors
 
     Examples
     --------
@@ -54,17 +147,20 @@ class Genotypes(Data):
     def __init__(self, fname: Path | str, log: Logger = None):
         super().__init__(fname, log)
         self.samples = tuple()
+        # the strings are stored as python objects instead of fixed-width unicode; this
+        # uses much less memory and never truncates long IDs or alleles
         self.variants = np.array(
             [],
             dtype=[
-                ("id", "U50"),
-                ("chrom", "U10"),
+                ("id", object),
+                ("chrom", object),
                 ("pos", np.uint32),
             ],
         )
         self._prephased = False
         self._samp_idx = None
         self._var_idx = None
+        self._block_size = 2**20
 
     @classmethod
     def load(
@@ -73,11 +169,14 @@ class Genotypes(Data):
         region: str = None,
         samples: list[str] = None,
         variants: set[str] = None,
+        n_jobs: int = 1,
+        cache: bool = False,
     ) -> Genotypes:
         """
         Load genotypes from a VCF file
 
-        Read the file contents, check the genotype phase, and create the MAC matrix
+        Read the file contents and check the genotypes for missingness, multiallelic
+        variants, and phase
 
         Parameters
         ----------
@@ -89,6 +188,19 @@ class Genotypes(Data):
             See documentation for :py:meth:`~.Genotypes.read`
         variants : set[str], optional
             See documentation for :py:meth:`~.Genotypes.read`
+        n_jobs : int, optional
+            The number of processes to use for reading the genotypes
+
+            If this value is greater than 1, the region will be split into smaller
+            sub-regions that are read in parallel. This only works if the VCF is
+            indexed. Otherwise, the genotypes are read serially.
+        cache : bool, optional
+            Whether to save the loaded genotypes to .gts.npy and .gts.npz files next to
+            the genotypes file, so that they can be memory-mapped instead of parsed the
+            next time they're loaded with the same parameters
+
+            The cache is ignored if the genotypes file has been modified since the
+            cache was created.
 
         Returns
         -------
@@ -96,19 +208,228 @@ class Genotypes(Data):
             A Genotypes object with the data loaded into its properties
         """
         genotypes = cls(fname)
-        genotypes.read(region, samples, variants)
+        if cache and genotypes._read_cache(region, samples, variants):
+            return genotypes
+        if n_jobs > 1:
+            genotypes._read_parallel(region, samples, variants, n_jobs)
+        else:
+            genotypes.read(region, samples, variants)
         genotypes.check_missing()
         genotypes.check_biallelic()
         genotypes.check_phase()
-        # genotypes.to_MAC()
+        if cache:
+            genotypes._write_cache(region, samples, variants)
         return genotypes
 
+    def _cache_paths(self) -> tuple[Path, Path]:
+        """
+        Get the paths to the files that cache the genotypes stored in this object
+
+        This is a helper function for :py:meth:`~.Genotypes._read_cache` and
+        :py:meth:`~.Genotypes._write_cache`
+
+        Returns
+        -------
+        tuple[Path, Path]
+            The path to the .npy file containing :py:attr:`~.Genotypes.data` and the
+            path to the .npz file containing everything else
+        """
+        return (
+            self.fname.with_name(self.fname.name + ".gts.npy"),
+            self.fname.with_name(self.fname.name + ".gts.npz"),
+        )
+
+    def _cache_sources(self) -> list[Path]:
+        """
+        Get the paths to the files from which the genotypes are read
+
+        This is a helper function for :py:meth:`~.Genotypes._cache_key`. The cache is
+        invalidated whenever any of these files change.
+
+        Returns
+        -------
+        list[Path]
+            The paths to the input files
+        """
+        return [self.fname]
+
+    def _cache_key(
+        self, region: str = None, samples: list[str] = None, variants: set[str] = None
+    ) -> str:
+        """
+        Describe the file and parameters used to load the genotypes
+
+        This is a helper function for :py:meth:`~.Genotypes._read_cache` and
+        :py:meth:`~.Genotypes._write_cache`. A cache can only be used if its key
+        matches.
+
+        Parameters
+        ----------
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        samples : list[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        variants : set[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+
+        Returns
+        -------
+        str
+            A string that changes whenever the files or the parameters change
+        """
+        stats = [
+            (source.stat().st_mtime_ns, source.stat().st_size)
+            for source in self._cache_sources()
+        ]
+        return repr(
+            (
+                self.__class__.__name__,
+                stats,
+                region,
+                None if samples is None else sorted(samples),
+                None if variants is None else sorted(variants),
+            )
+        )
+
+    def _cache_arrays(self) -> dict[str, npt.NDArray]:
+        """
+        Convert the properties of this object (except for the data) into arrays that
+        can be cached
+
+        This is a helper function for :py:meth:`~.Genotypes._write_cache`. It's
+        separate so that child classes can cache their own properties, too.
+
+        Strings are stored as fixed-width unicode, so that the cache can be loaded
+        without unpickling anything. Missing strings (like a '.' variant ID) become
+        empty strings.
+
+        Returns
+        -------
+        dict[str, npt.NDArray]
+            The arrays to store in the cache, keyed by their names
+        """
+        arrays = {"samples": np.array(self.samples, dtype=str)}
+        for field, (dtype, _) in self.variants.dtype.fields.items():
+            values = self.variants[field]
+            if dtype == object:
+                values = np.array(["" if val is None else val for val in values], str)
+            arrays[f"variants_{field}"] = values
+        return arrays
+
+    def _restore_cache_arrays(self, arrays: dict[str, npt.NDArray]):
+        """
+        Set the properties of this object from arrays created by
+        :py:meth:`~.Genotypes._cache_arrays`
+
+        This is a helper function for :py:meth:`~.Genotypes._read_cache`
+
+        Parameters
+        ----------
+        arrays : dict[str, npt.NDArray]
+            The arrays loaded from the cache, keyed by their names
+        """
+        self.samples = tuple(arrays["samples"].tolist())
+        num_variants = len(arrays["variants_pos"])
+        variants = np.empty((num_variants,), dtype=self.variants.dtype)
+        for field, (dtype, _) in self.variants.dtype.fields.items():
+            values = arrays[f"variants_{field}"]
+            if dtype == object:
+                values = [val or None for val in values.tolist()]
+            variants[field] = values
+        self.variants = variants
+
+    def _read_cache(
+        self, region: str = None, samples: list[str] = None, variants: set[str] = None
+    ) -> bool:
+        """
+        Load the genotypes from the cache created by :py:meth:`~.Genotypes.load`
+
+        :py:attr:`~.Genotypes.data` is memory-mapped in copy-on-write mode, so
+        changes to it are never written back to the cache
+
+        Parameters
+        ----------
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        samples : list[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        variants : set[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+
+        Returns
+        -------
+        bool
+            True if the genotypes were loaded from the cache and False otherwise
+        """
+        data_path, meta_path = self._cache_paths()
+        if not (data_path.exists() and meta_path.exists()):
+            return False
+        try:
+            with np.load(meta_path, allow_pickle=False) as meta:
+                if str(meta["key"]) != self._cache_key(region, samples, variants):
+                    self.log.info(f"Ignoring outdated genotypes cache {meta_path}")
+                    return False
+                arrays = dict(meta)
+            data = np.load(data_path, mmap_mode="c", allow_pickle=False)
+        except (OSError, ValueError, KeyError) as e:
+            self.log.warning(f"Ignoring unreadable genotypes cache {meta_path}: {e}")
+            return False
+        # the data should match the metadata, in case they weren't written together
+        expected_shape = (len(arrays["samples"]), len(arrays["variants_pos"]))
+        if data.shape[:2] != expected_shape:
+            self.log.warning(f"Ignoring inconsistent genotypes cache {meta_path}")
+            return False
+        self._restore_cache_arrays(arrays)
+        self.data = data
+        self.log.info(f"Loaded genotypes of size {self.data.shape} from {data_path}")
+        return True
+
+    def _write_cache(
+        self, region: str = None, samples: list[str] = None, variants: set[str] = None
+    ):
+        """
+        Save the genotypes to a cache that can be used by :py:meth:`~.Genotypes.load`
+
+        The old cache is invalidated before anything is written, and each file is
+        written to a unique temporary path before being renamed, so that a failure
+        midway never leaves behind a key that matches the wrong data.
+
+        Parameters
+        ----------
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        samples : list[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        variants : set[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        """
+        data_path, meta_path = self._cache_paths()
+        try:
+            try:
+                meta_path.unlink()
+            except FileNotFoundError:
+                # there's no old cache, or another process already removed it
+                pass
+            _save_atomically(data_path, np.save, self.data, allow_pickle=False)
+            _save_atomically(
+                meta_path,
+                np.savez,
+                key=self._cache_key(region, samples, variants),
+                **self._cache_arrays(),
+            )
+        except OSError as e:
+            self.log.warning(f"Failed to cache the genotypes in {data_path}: {e}")
+            return
+        self.log.info(f"Cached genotypes in {data_path}")
+
     def read(
         self,
         region: str = None,
         samples: list[str] = None,
         variants: set[str] = None,
         max_variants: int = None,
+        exclude_multiallelic: bool = False,
+        min_maf: float = None,
     ):
         """
         Read genotypes from a VCF into a numpy matrix stored in :py:attr:`~.Genotypes.data`
@@ -146,62 +467,340 @@ class Genotypes(Data):
             appropriately. You can also use the bcftools "counts" plugin to obtain the
             number of expected sites within a region.
 
+            If this value is not provided, we count the variants with a quick
+            preliminary pass over the file (or region) that skips the genotypes. The
+            count accounts for exclude_multiallelic but not for min_maf, since the
+            frequencies can't be computed without the genotypes.
+
             Note that this value is ignored if the variants argument is provided.
+        exclude_multiallelic : bool, optional
+            Skip any variants with more than one ALT allele while reading the file
+
+            This is faster and uses less memory than discarding them afterward via
+            :py:meth:`~.Genotypes.check_biallelic`
+        min_maf : float, optional
+            Skip any variants with a minor allele frequency rarer than this threshold
+            while reading the file
+
+            The frequencies are computed by cyvcf2 from the called genotypes
         """
         super().read()
-        records = self.__iter__(region=region, samples=samples, variants=variants)
+        records = self.__iter__(
+            region=region,
+            samples=samples,
+            variants=variants,
+            exclude_multiallelic=exclude_multiallelic,
+            min_maf=min_maf,
+        )
         if variants is not None:
             max_variants = len(variants)
-        # check whether we can preallocate memory instead of making copies
-        if max_variants is None:
-            self.log.warning(
-                "The max_variants parameter was not specified. We have no choice but to"
-                " append to an ever-growing array, which can lead to memory overuse!"
+        elif max_variants is None:
+            max_variants = self._count_variants(region, exclude_multiallelic)
+        # preallocate arrays! this will save us lots of memory and speed b/c
+        # appends can sometimes make copies
+        self.variants = np.empty((max_variants,), dtype=self.variants.dtype)
+        # in order to check_phase() later, we must store the phase info, as well
+        # samples are rows and variants are columns, so we fill in one column at a time
+        self.data = np.empty(
+            (len(self.samples), max_variants, (2 + (not self._prephased))),
+            dtype=np.uint8,
+        )
+        num_seen = 0
+        for rec in records:
+            if num_seen >= max_variants:
+                break
+            self.variants[num_seen] = rec.variants
+            self.data[:, num_seen] = rec.data
+            num_seen += 1
+        if max_variants > num_seen:
+            self.log.info(
+                f"Removing {max_variants-num_seen} unneeded variant records that "
+                "were preallocated."
             )
-            variants_arr = []
-            data_arr = []
-            for rec in records:
-                variants_arr.append(rec.variants)
-                data_arr.append(rec.data)
-            self.log.info(f"Copying {len(variants_arr)} variants into np arrays.")
-            # convert to np array for speedy operations later on
-            self.variants = np.array(variants_arr, dtype=self.variants.dtype)
-            self.data = np.array(data_arr, dtype=np.uint8)
-        else:
-            # preallocate arrays! this will save us lots of memory and speed b/c
-            # appends can sometimes make copies
-            self.variants = np.empty((max_variants,), dtype=self.variants.dtype)
-            # in order to check_phase() later, we must store the phase info, as well
-            self.data = np.empty(
-                (max_variants, len(self.samples), (2 + (not self._prephased))),
-                dtype=np.uint8,
+            self.variants = self.variants[:num_seen]
+            # copy the columns we need so that the matrix stays contiguous
+            self.data = np.ascontiguousarray(self.data[:, :num_seen])
+        if 0 in self.data.shape:
+            self.log.warning(
+                "Failed to load genotypes. If you specified a region, check that the"
+                " contig name matches! For example, double-check the 'chr' prefix."
             )
-            num_seen = 0
-            for rec in records:
+
+    def read_compact(
+        self,
+        region: str = None,
+        samples: list[str] = None,
+        variants: set[str] = None,
+        max_variants: int = None,
+    ) -> namedtuple:
+        """
+        Read the number of ALT alleles in each genotype from a VCF, instead of the
+        alleles themselves, without storing anything
+
+        This is faster and uses a third of the memory of :py:meth:`~.Genotypes.read`,
+        since cyvcf2 can count the alleles of each record in a single step. Use it when
+        you only need allele counts (for LD or MAF, for example) and not the allele on
+        each strand.
+
+        Unlike :py:meth:`~.Genotypes.read`, none of the properties of this object are
+        modified, so it can be called before or after the genotypes are loaded.
+        Variants with more than one ALT allele are always skipped, since their alleles
+        cannot be counted this way. Also, note that cyvcf2 counts genotypes with only
+        one missing allele (ex: 0|.) as though they weren't missing.
+
+        Parameters
+        ----------
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        samples : list[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        variants : set[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        max_variants : int, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+
+        Returns
+        -------
+        namedtuple
+            A namedtuple with four items:
+
+            1. data: an n (samples) x p (variants) array of ALT allele counts, where
+               missing genotypes are encoded as the max value for uint8
+            2. phased: an n x p array denoting whether each genotype is phased
+            3. samples: see documentation for :py:attr:`~.Genotypes.samples`
+            4. variants: see documentation for :py:attr:`~.Genotypes.variants`
+        """
+        Compact = namedtuple("Compact", "data phased samples variants")
+        # with gts012, cyvcf2 encodes genotypes as 0 (HOM_REF), 1 (HET), 2 (HOM_ALT),
+        # and 3 (UNKNOWN); we map each of these to the number of ALT alleles
+        to_count = np.array([0, 1, 2, np.iinfo(np.uint8).max], dtype=np.uint8)
+        vcf = VCF(str(self.fname), samples=samples, lazy=True, gts012=True)
+        samples_read = tuple(vcf.samples)
+        if variants is not None:
+            max_variants = len(variants)
+        elif max_variants is None:
+            max_variants = self._count_variants(region, exclude_multiallelic=True)
+        variants_arr = np.empty((max_variants,), dtype=self.variants.dtype)
+        counts = np.empty((len(samples_read), max_variants), dtype=np.uint8)
+        phased = np.empty((len(samples_read), max_variants), dtype=np.bool_)
+        num_seen = 0
+        records = self._iterate_records(
+            vcf, region, variants, exclude_multiallelic=True
+        )
+        with closing(records):
+            for variant in records:
                 if num_seen >= max_variants:
                     break
-                self.variants[num_seen] = rec.variants
-                self.data[num_seen] = rec.data
+                variants_arr[num_seen] = self._variant_arr(variant)
+                counts[:, num_seen] = to_count[variant.gt_types]
+                phased[:, num_seen] = variant.gt_phases
                 num_seen += 1
-            if max_variants > num_seen:
-                self.log.info(
-                    f"Removing {max_variants-num_seen} unneeded variant records that "
-                    "were preallocated b/c max_variants was specified."
+        if max_variants > num_seen:
+            self.log.info(
+                f"Removing {max_variants-num_seen} unneeded variant records that "
+                "were preallocated."
+            )
+            variants_arr = variants_arr[:num_seen]
+            counts = np.ascontiguousarray(counts[:, :num_seen])
+            phased = np.ascontiguousarray(phased[:, :num_seen])
+        if 0 in counts.shape:
+            self.log.warning(
+                "Failed to load genotypes. If you specified a region, check that the"
+                " contig name matches! For example, double-check the 'chr' prefix."
+            )
+        return Compact(counts, phased, samples_read, variants_arr)
+
+    def _split_region(self, region: str = None, num_chunks: int = 1) -> list[tuple]:
+        """
+        Split a region of the VCF into smaller sub-regions that can be read separately
+
+        This is a helper function for :py:meth:`~.Genotypes._read_parallel`. If no
+        region is provided, the VCF is split by each of the contigs in its index. A
+        single contig is split further into equally-sized intervals if its length is
+        known.
+
+        Parameters
+        ----------
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        num_chunks : int, optional
+            The number of sub-regions to split a single contig into
+
+        Returns
+        -------
+        list[tuple[str, int]]
+            A list of sub-regions. Each sub-region is a tuple of the region string and
+            the minimum position of the variants that should be kept from it. (Records
+            that overlap the start of a sub-region will also be returned for the
+            sub-region that comes before it.) The position is 0 if all records should
+            be kept.
+
+            If the VCF is not indexed, the region is returned as-is.
+        """
+        vcf = VariantFile(str(self.fname))
+        if vcf.index is None:
+            vcf.close()
+            return [(region, 0)]
+        if region is None:
+            contigs = list(vcf.index.keys())
+            intervals = [(contig, 1, None) for contig in contigs]
+        else:
+            interval = self._parse_region(region, vcf)
+            if interval is None:
+                self.log.debug(f"Couldn't parse region {region}. Reading it serially.")
+                vcf.close()
+                return [(region, 0)]
+            intervals = [interval]
+        if len(intervals) == 1:
+            chrom, start, end = intervals[0]
+            if end is None and chrom in vcf.header.contigs:
+                end = vcf.header.contigs[chrom].length
+            if end is not None:
+                bounds = np.linspace(start, end + 1, num_chunks + 1, dtype=np.uint64)
+                bounds = np.unique(bounds)
+                intervals = [
+                    (chrom, int(bounds[i]), int(bounds[i + 1]) - 1)
+                    for i in range(len(bounds) - 1)
+                ]
+        vcf.close()
+        if len(intervals) == 1 and region is not None:
+            return [(region, 0)]
+        sub_regions = []
+        for idx, (chrom, start, end) in enumerate(intervals):
+            keep_from = start if idx and intervals[idx - 1][0] == chrom else 0
+            if end is None:
+                sub_regions.append((chrom, keep_from))
+            else:
+                sub_regions.append((f"{chrom}:{start}-{end}", keep_from))
+        return sub_regions
+
+    def _parse_region(self, region: str, vcf: VariantFile) -> tuple | None:
+        """
+        Parse a region string into its contig, start, and end coordinates
+
+        This is a helper function for :py:meth:`~.Genotypes._split_region`. Like
+        htslib, it accepts commas within the coordinates and contig names that contain
+        ':' or '-'.
+
+        Parameters
+        ----------
+        region : str
+            See documentation for :py:meth:`~.Genotypes.read`
+        vcf : VariantFile
+            The pysam.VariantFile object whose header and index list the contigs
+
+        Returns
+        -------
+        tuple[str, int, int] | None
+            The contig, start, and end of the region, where the end is None if it
+            wasn't specified, or None if the region could not be parsed or ends before
+            it starts
+        """
+        if region in vcf.header.contigs or region in vcf.index:
+            return (region, 1, None)
+        chrom, sep, coords = region.rpartition(":")
+        if not sep:
+            return (region, 1, None)
+        start, _, end = coords.replace(",", "").partition("-")
+        try:
+            start = int(start) if start else 1
+            end = int(end) if end else None
+        except ValueError:
+            return None
+        if end is not None and end < start:
+            return None
+        return (chrom, start, end)
+
+    def _read_parallel(
+        self,
+        region: str = None,
+        samples: list[str] = None,
+        variants: set[str] = None,
+        n_jobs: int = 1,
+    ):
+        """
+        Read genotypes from a VCF by reading sub-regions of it in parallel processes
+
+        This is a helper function for :py:meth:`~.Genotypes.load`
+
+        Parameters
+        ----------
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        samples : list[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        variants : set[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        n_jobs : int, optional
+            See documentation for :py:meth:`~.Genotypes.load`
+        """
+        sub_regions = self._split_region(region, n_jobs)
+        if len(sub_regions) < 2:
+            self.read(region, samples, variants)
+            return
+        self.log.info(
+            f"Reading genotypes from {len(sub_regions)} regions with {n_jobs} processes"
+        )
+        vcf = VCF(str(self.fname), samples=samples, lazy=True)
+        samples_read = tuple(vcf.samples)
+        vcf.close()
+        chunks = [self.__class__(self.fname, self.log) for _ in sub_regions]
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunks = list(
+                executor.map(
+                    _read_chunk,
+                    chunks,
+                    *zip(*sub_regions),
+                    [samples] * len(chunks),
+                    [variants] * len(chunks),
                 )
-                self.variants = self.variants[:num_seen]
-                self.data = self.data[:num_seen]
+            )
+        super().read()
+        self.samples = samples_read
+        self.variants = np.concatenate([chunk.variants for chunk in chunks])
+        self.data = np.concatenate([chunk.data for chunk in chunks], axis=1)
         if 0 in self.data.shape:
             self.log.warning(
                 "Failed to load genotypes. If you specified a region, check that the"
                 " contig name matches! For example, double-check the 'chr' prefix."
             )
-        # transpose the GT matrix so that samples are rows and variants are columns
-        self.log.info(f"Transposing genotype matrix of size {self.data.shape}.")
-        self.data = self.data.transpose((1, 0, 2))
 
-    def _variant_arr(self, record: Variant):
+    def _count_variants(
+        self, region: str = None, exclude_multiallelic: bool = False
+    ) -> int:
+        """
+        Count the number of variants in the VCF without parsing any of the genotypes
+
+        This is a helper function for :py:meth:`~.Genotypes.read`. It allows us to
+        preallocate arrays of the correct size when max_variants isn't provided.
+
+        Parameters
+        ----------
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        exclude_multiallelic : bool, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+
+        Returns
+        -------
+        int
+            The number of variant records in the file (or within the region) that
+            will be loaded
         """
-        Construct a np array from the metadata in a line of the VCF
+        # don't load any of the samples, so that htslib can skip the FORMAT fields
+        vcf = VCF(str(self.fname), samples=[], lazy=True)
+        num_variants = sum(
+            1
+            for variant in vcf(region)
+            if not (exclude_multiallelic and len(variant.ALT) > 1)
+        )
+        vcf.close()
+        self.log.debug(f"Counted {num_variants} variants in the genotypes file")
+        return num_variants
+
+    def _variant_arr(self, record: Variant) -> tuple:
+        """
+        Extract the metadata in a line of the VCF
 
         This is a helper function for :py:meth:`~.Genotypes._iterate`. It's separate
         so that it can easily be overridden in any child classes.
@@ -213,15 +812,106 @@ class Genotypes(Data):
 
         Returns
         -------
-        npt.NDArray
-            A row from the :py:attr:`~.Genotypes.variants` array
+        tuple
+            The fields of a row from the :py:attr:`~.Genotypes.variants` array
+
+            A plain tuple can be assigned directly into a preallocated row of the
+            array, which is much faster than creating a new np array for each record
         """
-        return np.array(
-            (record.ID, record.CHROM, record.POS),
-            dtype=self.variants.dtype,
-        )
+        # intern the contig name so that all variants on a contig share one string
+        return (record.ID, sys.intern(record.CHROM), record.POS)
 
-    def _iterate(self, vcf: VCF, region: str = None, variants: set[str] = None):
+    def _variant_rows(self, batch_size: int = 2**10) -> Iterator[tuple]:
+        """
+        An endless generator over the rows of preallocated batches of variants
+
+        This is a helper function for the _iterate() methods. Rather than creating a
+        new np array for the metadata of every record, we fill in the next row of a
+        batch and yield a view of it. A new batch is allocated once the last one is
+        full, so rows that have already been yielded are never overwritten.
+
+        Parameters
+        ----------
+        batch_size : int, optional
+            The number of rows to allocate at once
+
+        Yields
+        ------
+        Iterator[tuple[npt.NDArray, int]]
+            The current batch and the index of the next empty row within it
+        """
+        while True:
+            batch = np.empty((batch_size,), dtype=self.variants.dtype)
+            for idx in range(batch_size):
+                yield batch, idx
+
+    def _genotype_arr(self, record: Variant) -> npt.NDArray[np.uint8]:
+        """
+        Construct a np array from the genotypes in a line of the VCF
+
+        This is a helper function for :py:meth:`~.Genotypes._iterate`. It uses
+        cyvcf2's numpy accessor, which copies the genotypes out of htslib in a single
+        step instead of creating a Python list of lists for every record.
+
+        Parameters
+        ----------
+        record: Variant
+            A cyvcf2.Variant object from which to fetch genotypes
+
+        Returns
+        -------
+        npt.NDArray[np.uint8]
+            An array of size n x 3 (or n x 2, if self._prephased is True) where
+            missing alleles (-1) are encoded as the max value for uint8
+        """
+        try:
+            data = record.genotype.array()
+        except AttributeError:
+            # older versions of cyvcf2 lack the numpy accessor
+            data = record.genotypes
+        # slice before casting, so that we only copy the columns that we need
+        return np.asarray(data)[:, : (2 + (not self._prephased))].astype(np.uint8)
+
+    def _skip_variant(
+        self,
+        record: Variant,
+        exclude_multiallelic: bool = False,
+        min_maf: float = None,
+    ) -> bool:
+        """
+        Whether a line of the VCF should be skipped because it doesn't pass the filters
+
+        This is a helper function for :py:meth:`~.Genotypes._iterate`. The cheapest
+        checks are done first.
+
+        Parameters
+        ----------
+        record: Variant
+            A cyvcf2.Variant object to check
+        exclude_multiallelic : bool, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        min_maf : float, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+
+        Returns
+        -------
+        bool
+            True if the variant should be skipped and False otherwise
+        """
+        if exclude_multiallelic and len(record.ALT) > 1:
+            return True
+        if min_maf is not None and min(record.aaf, 1 - record.aaf) < min_maf:
+            return True
+        return False
+
+    def _iterate(
+        self,
+        vcf: VCF,
+        region: str = None,
+        variants: set[str] = None,
+        exclude_multiallelic: bool = False,
+        min_maf: float = None,
+    ):
         """
         A generator over the lines of a VCF
 
@@ -235,6 +925,10 @@ class Genotypes(Data):
             See documentation for :py:meth:`~.Genotypes.read`
         variants : set[str], optional
             See documentation for :py:meth:`~.Genotypes.read`
+        exclude_multiallelic : bool, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        min_maf : float, optional
+            See documentation for :py:meth:`~.Genotypes.read`
 
         Yields
         ------
@@ -244,30 +938,82 @@ class Genotypes(Data):
         """
         self.log.info(f"Loading genotypes from {len(self.samples)} samples")
         Record = namedtuple("Record", "data variants")
+        rows = self._variant_rows()
+        records = self._iterate_records(
+            vcf, region, variants, exclude_multiallelic, min_maf
+        )
+        # close the records explicitly, in case we're closed before they're exhausted
+        with closing(records):
+            for variant in records:
+                # save meta information about each variant
+                batch, row = next(rows)
+                batch[row] = self._variant_arr(variant)
+                variant_arr = batch[row]
+                # extract the genotypes to a matrix of size n x 3
+                # the last dimension has three items:
+                # 1) presence of REF in strand one
+                # 2) presence of REF in strand two
+                # 3) whether the genotype is phased (if self._prephased is False)
+                data = self._genotype_arr(variant)
+                yield Record(data, variant_arr)
+
+    def _iterate_records(
+        self,
+        vcf: VCF,
+        region: str = None,
+        variants: set[str] = None,
+        exclude_multiallelic: bool = False,
+        min_maf: float = None,
+    ) -> Iterator[Variant]:
+        """
+        A generator over the lines of a VCF that pass the filters
+
+        This is a helper function for the _iterate() methods and
+        :py:meth:`~.Genotypes.read_compact`. The VCF is closed once the generator is
+        exhausted or closed.
+
+        Parameters
+        ----------
+        vcf: VCF
+            The cyvcf2.VCF object from which to fetch variant records
+        region : str, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        variants : set[str], optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        exclude_multiallelic : bool, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        min_maf : float, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+
+        Yields
+        ------
+        Iterator[Variant]
+            Each cyvcf2.Variant object that should be loaded
+        """
         num_seen = 0
-        # iterate over each line in the VCF
-        # note, this can take a lot of time if there are many samples
-        for variant in vcf(region):
-            if variants is not None and variant.ID not in variants:
-                if num_seen >= len(variants):
-                    # exit early if we've already found all the variants
-                    break
-                continue
-            # save meta information about each variant
-            variant_arr = self._variant_arr(variant)
-            # extract the genotypes to a matrix of size n x 3
-            # the last dimension has three items:
-            # 1) presence of REF in strand one
-            # 2) presence of REF in strand two
-            # 3) whether the genotype is phased (if self._prephased is False)
-            data = np.array(variant.genotypes, dtype=np.uint8)
-            data = data[:, : (2 + (not self._prephased))]
-            yield Record(data, variant_arr)
-            num_seen += 1
-        vcf.close()
+        try:
+            # iterate over each line in the VCF
+            # note, this can take a lot of time if there are many samples
+            for variant in vcf(region):
+                if variants is not None and variant.ID not in variants:
+                    if num_seen >= len(variants):
+                        # exit early if we've already found all the variants
+                        break
+                    continue
+                if self._skip_variant(variant, exclude_multiallelic, min_maf):
+                    continue
+                yield variant
+                num_seen += 1
+        finally:
+            vcf.close()
 
     def __iter__(
-        self, region: str = None, samples: list[str] = None, variants: set[str] = None
+        self,
+        region: str = None,
+        samples: list[str] = None,
+        variants: set[str] = None,
+        exclude_multiallelic: bool = False,
+        min_maf: float = None,
     ) -> Iterator[namedtuple]:
         """
         Read genotypes from a VCF line by line without storing anything
@@ -280,6 +1026,10 @@ class Genotypes(Data):
             See documentation for :py:meth:`~.Genotypes.read`
         variants : set[str], optional
             See documentation for :py:meth:`~.Genotypes.read`
+        exclude_multiallelic : bool, optional
+            See documentation for :py:meth:`~.Genotypes.read`
+        min_maf : float, optional
+            See documentation for :py:meth:`~.Genotypes.read`
 
         Returns
         -------
@@ -290,7 +1040,7 @@ class Genotypes(Data):
         self.samples = tuple(vcf.samples)
         # call another function to force the lines above to be run immediately
         # see https://stackoverflow.com/a/36726497
-        return self._iterate(vcf, region, variants)
+        return self._iterate(vcf, region, variants, exclude_multiallelic, min_maf)
 
     def index(self, samples: bool = True, variants: bool = True):
         """
@@ -453,8 +1203,8 @@ class Genotypes(Data):
             return
         # check: are there any variants that have genotype values above 1?
         # A genotype value above 1 would imply the variant has more than one ALT allele
-        multiallelic = np.any(self.data[:, :, :2] > 1, axis=2)
-        if np.any(multiallelic):
+        multiallelic = self._find_multiallelic()
+        if multiallelic is not None:
             samp_idx, variant_idx = np.nonzero(multiallelic)
             if discard_also:
                 self.log.info(f"Ignoring {len(variant_idx)} multiallelic variants")
@@ -476,6 +1226,38 @@ class Genotypes(Data):
             )
         self.data = self.data.astype(np.bool_)
 
+    def _find_multiallelic(self) -> npt.NDArray[np.bool_] | None:
+        """
+        Find the genotypes that have an allele above 1
+
+        This is a helper function for :py:meth:`~.Genotypes.check_biallelic`. When
+        possible, the two strands of each genotype are viewed as a single uint16, so
+        that a single operation checks both alleles at once. An allele is above 1 iff
+        any bit other than its lowest is set, so we can test both bytes with the mask
+        0xFEFE. Otherwise (ex: if the alleles aren't adjacent in memory), we fall back
+        to comparing each allele separately.
+
+        Returns
+        -------
+        npt.NDArray[np.bool_] | None
+            An n (samples) x p (variants) array denoting whether each genotype has an
+            allele above 1, or None if there aren't any such genotypes
+        """
+        alleles = self.data[:, :, :2]
+        try:
+            strands = alleles.view(np.uint16)[:, :, 0]
+        except ValueError:
+            # start with a single reduction over the matrix, so that we don't
+            # allocate the full boolean matrix unless we find a multiallelic variant
+            if np.max(alleles, initial=0) > 1:
+                return np.any(alleles > 1, axis=2)
+            return None
+        # OR-ing every genotype together doesn't allocate anything, so it's a cheap
+        # way to see whether we need to find the genotypes themselves
+        if np.bitwise_or.reduce(strands, axis=None) & 0xFEFE:
+            return (strands & 0xFEFE).astype(np.bool_)
+        return None
+
     def check_phase(self):
         """
         Check that the genotypes are phased then remove the phasing info from the data
@@ -491,14 +1273,23 @@ class Genotypes(Data):
             self.log.warning("Phase information has already been removed from the data")
             return
         # check: are there any variants that are heterozygous and unphased?
-        unphased = (self.data[:, :, 0] ^ self.data[:, :, 1]) & (~self.data[:, :, 2])
-        if np.any(unphased):
-            samp_idx, variant_idx = np.nonzero(unphased)
-            raise ValueError(
-                "Variant with ID {} at POS {}:{} is unphased for sample {}".format(
-                    *tuple(self.variants[variant_idx[0]])[:3], self.samples[samp_idx[0]]
-                )
-            )
+        # If every genotype is phased, there's no need to look for heterozygotes
+        if not self.data[:, :, 2].all():
+            # scan the samples in blocks, so that the temporary arrays stay small and
+            # we can stop as soon as we've found an unphased heterozygote
+            block_size = max(1, self._block_size // max(1, self.data.shape[1]))
+            for start in range(0, self.data.shape[0], block_size):
+                block = self.data[start : start + block_size]
+                unphased = (block[:, :, 0] ^ block[:, :, 1]) & (~block[:, :, 2])
+                if np.any(unphased):
+                    samp_idx, variant_idx = np.nonzero(unphased)
+                    raise ValueError(
+                        "Variant with ID {} at POS {}:{} is unphased for sample {}"
+                        .format(
+                            *tuple(self.variants[variant_idx[0]])[:3],
+                            self.samples[start + samp_idx[0]],
+                        )
+                    )
         # remove the last dimension that contains the phase info
         self.data = self.data[:, :, :2]
 
@@ -542,8 +1333,10 @@ class Genotypes(Data):
         """
         num_strands = 2 * self.data.shape[0]
         # TODO: make this work for multi-allelic variants, too?
-        ref_af = self.data[:, :, :2].astype(np.bool_).sum(axis=(0, 2)) / num_strands
-        maf = np.array([ref_af, 1 - ref_af]).min(axis=0)
+        # avoid copying the genotype matrix if check_biallelic() has already made it bool
+        alleles = self.data[:, :, :2].astype(np.bool_, copy=False)
+        ref_af = alleles.sum(axis=(0, 2)) / num_strands
+        maf = np.minimum(ref_af, 1 - ref_af)
         if threshold is None:
             return maf
         rare_variants = maf < threshold
@@ -570,6 +1363,57 @@ class Genotypes(Data):
                     raise ValueError(msg)
         return maf
 
+    def pack(self) -> npt.NDArray[np.uint8]:
+        """
+        Pack the genotypes into bits, so that each byte stores the alleles of eight
+        samples
+
+        This is useful for computations over many pairs of variants (like LD), since
+        the packed matrix is an eighth of the size of :py:attr:`~.Genotypes.data`.
+        :py:attr:`~.Genotypes.data` itself is left unchanged.
+
+        .. note::
+            You must call :py:meth:`~.Genotypes.check_biallelic` before executing this
+            method.
+
+        Raises
+        ------
+        ValueError
+            If the genotypes have not been checked for biallelic-ness yet
+
+        Returns
+        -------
+        npt.NDArray[np.uint8]
+            The genotypes in a ceil(n/8) (samples) x p (variants) x 2 (strands) array
+        """
+        if self.data.dtype != np.bool_:
+            raise ValueError(
+                "Only biallelic genotypes can be packed. Call check_biallelic() first."
+            )
+        return np.packbits(self.data[:, :, :2], axis=0)
+
+    def unpack_variant(
+        self, packed: npt.NDArray[np.uint8], idx: int
+    ) -> npt.NDArray[np.bool_]:
+        """
+        Unpack the genotypes of a single variant from the output of
+        :py:meth:`~.Genotypes.pack`
+
+        Parameters
+        ----------
+        packed: npt.NDArray[np.uint8]
+            The packed genotypes returned by :py:meth:`~.Genotypes.pack`
+        idx: int
+            The index of the variant within :py:attr:`~.Genotypes.variants`
+
+        Returns
+        -------
+        npt.NDArray[np.bool_]
+            The genotypes of the variant in an n (samples) x 2 (strands) array
+        """
+        unpacked = np.unpackbits(packed[:, idx], axis=0, count=len(self.samples))
+        return unpacked.astype(np.bool_)
+
     def check_sorted(self):
         """
         Check that the variant coordinates are sorted
@@ -621,11 +1465,11 @@ class GenotypesRefAlt(Genotypes):
         self.variants = np.array(
             [],
             dtype=[
-                ("id", "U50"),
-                ("chrom", "U10"),
+                ("id", object),
+                ("chrom", object),
                 ("pos", np.uint32),
-                ("ref", "U100"),
-                ("alt", "U100"),
+                ("ref", object),
+                ("alt", object),
             ],
         )
 
@@ -633,15 +1477,12 @@ class GenotypesRefAlt(Genotypes):
         """
         See documentation for :py:meth:`~.Genotypes._variant_arr`
         """
-        return np.array(
-            (
-                record.ID,
-                record.CHROM,
-                record.POS,
-                record.REF,
-                record.ALT[0],
-            ),
-            dtype=self.variants.dtype,
+        return (
+            record.ID,
+            sys.intern(record.CHROM),
+            record.POS,
+            record.REF,
+            record.ALT[0],
         )
 
     def write(self):
@@ -813,13 +1654,100 @@ class GenotypesPLINK(GenotypesRefAlt):
         """
         return (pos[0] == chrom) and (start <= pos[1]) and (end >= pos[1])
 
+    def _split_region(self, region: str = None, num_chunks: int = 1) -> list[tuple]:
+        """
+        See documentation for :py:meth:`~.Genotypes._split_region`
+
+        PGEN files cannot be queried by region, so the region is never split
+        """
+        return [(region, 0)]
+
+    def read_compact(
+        self,
+        region: str = None,
+        samples: list[str] = None,
+        variants: set[str] = None,
+        max_variants: int = None,
+    ) -> namedtuple:
+        """
+        See documentation for :py:meth:`~.Genotypes.read_compact`
+
+        The ALT allele counts are read directly from the PGEN file by pgenlib. If
+        self._prephased is True, the genotypes are all assumed to be phased, so the
+        phase information doesn't need to be read at all.
+        """
+        import pgenlib
+
+        Compact = namedtuple("Compact", "data phased samples variants")
+        # read the samples and variants into a separate object, so that the
+        # properties of this one are left alone
+        gts = self.__class__(self.fname, self.log, self.chunk_size)
+        sample_idxs = gts.read_samples(samples)
+        with pgenlib.PgenReader(
+            bytes(str(self.fname), "utf8"), sample_subset=sample_idxs
+        ) as pgen:
+            if variants is not None:
+                max_variants = len(variants)
+            if max_variants is None:
+                max_variants = pgen.get_variant_ct()
+            else:
+                max_variants = min(max_variants, pgen.get_variant_ct())
+            indices = gts.read_variants(region, variants, max_variants)
+            # alleles cannot be counted for variants with more than one ALT allele
+            biallelic = np.array(
+                ["," not in alt for alt in gts.variants["alt"]], dtype=np.bool_
+            )
+            indices = indices[biallelic]
+            variants_arr = gts.variants[biallelic]
+            num_samples, num_variants = len(sample_idxs), len(indices)
+            counts = np.empty((num_samples, num_variants), dtype=np.uint8)
+            phased = np.ones((num_samples, num_variants), dtype=np.bool_)
+            # how many variants should we load at once?
+            chunks = self.chunk_size
+            if chunks is None or chunks > num_variants:
+                chunks = max(num_variants, 1)
+            # we allocate these buffers once and then reuse them for every chunk
+            counts_chunk = np.empty((chunks, num_samples), dtype=np.int8)
+            if not self._prephased:
+                alleles_chunk = np.empty((chunks, num_samples * 2), dtype=np.int32)
+                phased_chunk = np.empty((chunks, num_samples), dtype=np.uint8)
+            for start in range(0, num_variants, chunks):
+                end = min(start + chunks, num_variants)
+                size = end - start
+                pgen.read_list(indices[start:end], counts_chunk[:size])
+                # missing genotypes will have a value of -9
+                # let's make them be the max value for uint8, as in read()
+                counts_chunk[counts_chunk == -9] = -1
+                counts[:, start:end] = counts_chunk[:size].view(np.uint8).transpose()
+                if not self._prephased:
+                    pgen.read_alleles_and_phasepresent_list(
+                        indices[start:end], alleles_chunk[:size], phased_chunk[:size]
+                    )
+                    phased[:, start:end] = phased_chunk[:size].transpose()
+        if 0 in counts.shape:
+            self.log.warning(
+                "Failed to load genotypes. If you specified a region, check that the"
+                " contig name matches! For example, double-check the 'chr' prefix."
+            )
+        return Compact(counts, phased, gts.samples, variants_arr)
+
+    def _cache_sources(self) -> list[Path]:
+        """
+        See documentation for :py:meth:`~.Genotypes._cache_sources`
+
+        The PVAR and PSAM files are read alongside the PGEN file
+        """
+        return [self.fname] + [
+            self.fname.with_suffix(suffix) for suffix in (".pvar", ".psam")
+        ]
+
     def _variant_arr(
         self,
         record: list[str],
         cid: dict[str, int] = dict(zip(["CHROM", "POS", "ID", "REF", "ALT"], range(5))),
-    ):
+    ) -> tuple:
         """
-        Construct a np array from the metadata in a line of the PVAR file
+        Extract the metadata in a line of the PVAR file
 
         This is a helper function for :py:meth:`~.GenotypesPLINK._iterate_variants`.
         It's separate so that it can easily be overridden in any child classes.
@@ -836,19 +1764,15 @@ class GenotypesPLINK(GenotypesRefAlt):
 
         Returns
         -------
-        npt.NDArray
-            A row from the :py:attr:`~.GenotypesPLINK.variants` array
+        tuple
+            See documentation for :py:meth:`~.Genotypes._variant_arr`
         """
-        # TODO: remove the AAF column; right now, we just set it to 0.5 arbitrarily
-        return np.array(
-            (
-                record[cid["ID"]],
-                record[cid["CHROM"]],
-                record[cid["POS"]],
-                record[cid["REF"]],
-                record[cid["ALT"]],
-            ),
-            dtype=self.variants.dtype,
+        return (
+            record[cid["ID"]],
+            sys.intern(record[cid["CHROM"]]),
+            record[cid["POS"]],
+            record[cid["REF"]],
+            record[cid["ALT"]],
         )
 
     def _iterate_variants(
@@ -871,11 +1795,11 @@ class GenotypesPLINK(GenotypesRefAlt):
 
         Yields
         ------
-        Iterator[tuple[int, npt.NDArray]]
+        Iterator[tuple[int, tuple]]
             An iterator of tuples over each line in the file
 
             The first value is the index of the variant and the second is a line from
-            the file, encoded as a numpy mixed array type
+            the file, encoded as a tuple of the fields in the variants array
         """
         # split the region string so each portion is an element
         if region is not None:
@@ -1036,6 +1960,18 @@ class GenotypesPLINK(GenotypesRefAlt):
                 f"Reading genotypes from {len(self.samples)} samples and "
                 f"{len(indices)} variants in chunks of size {chunks} variants"
             )
+            # the genotypes start out as a simple 2D array with twice the number of
+            # samples, so each column is a different chromosomal strand
+            # we allocate this buffer once and then reuse it for every chunk
+            try:
+                data = np.empty((chunks, len(sample_idxs) * 2), dtype=np.int32)
+                if not self._prephased:
+                    phasing = np.empty((chunks, len(sample_idxs)), dtype=np.uint8)
+            except np.core._exceptions._ArrayMemoryError as e:
+                raise ValueError(
+                    "You don't have enough memory to load these genotypes! Try"
+                    " specifying a value to the chunk_size parameter, instead"
+                ) from e
             # iterate through chunks of variants
             for start in range(0, len(indices), chunks):
                 end = start + chunks
@@ -1043,45 +1979,30 @@ class GenotypesPLINK(GenotypesRefAlt):
                     end = len(indices)
                 size = end - start
                 self.log.debug(f"Loading from variant #{start} to variant #{end}")
-                # the genotypes start out as a simple 2D array with twice the number
-                # of samples
+                # slicing along the first axis keeps the buffers contiguous
+                data_chunk = data[:size]
                 if not self._prephased:
-                    # ...each column is a different chromosomal strand
-                    try:
-                        data = np.empty((size, len(sample_idxs) * 2), dtype=np.int32)
-                        phasing = np.zeros((size, len(sample_idxs)), dtype=np.uint8)
-                    except np.core._exceptions._ArrayMemoryError as e:
-                        raise ValueError(
-                            "You don't have enough memory to load these genotypes! Try"
-                            " specifying a value to the chunk_size parameter, instead"
-                        ) from e
+                    phasing_chunk = phasing[:size]
                     # The haplotype-major mode of read_alleles_and_phasepresent_list
                     # has not been implemented yet, so we need to read the genotypes
                     # in sample-major mode and then transpose them
                     pgen.read_alleles_and_phasepresent_list(
-                        indices[start:end], data, phasing
+                        indices[start:end], data_chunk, phasing_chunk
                     )
-                    # missing alleles will have a value of -9
-                    # let's make them be -1 to be consistent with cyvcf2
-                    data[data == -9] = -1
-                    # add phase info, then transpose the GT matrix so that samples are
-                    # rows and variants are columns
-                    self.data[:, start:end, :2] = data.reshape(
-                        (chunks, mat_shape[0], 2)
-                    ).transpose((1, 0, 2))
-                    self.data[:, start:end, 2] = phasing.transpose()
+                    # add phase info
+                    self.data[:, start:end, 2] = phasing_chunk.transpose()
                 else:
-                    # ...each row is a different chromosomal strand
-                    data = np.empty((size, len(sample_idxs) * 2), dtype=np.int32)
-                    pgen.read_alleles_list(indices[start:end], data)
-                    # missing alleles will have a value of -9
-                    # let's make them be -1 to be consistent with cyvcf2
-                    data[data == -9] = -1
-                    self.data[:, start:end] = data.reshape(
-                        (chunks, mat_shape[0], 2)
-                    ).transpose((1, 0, 2))
-                del data
-                gc.collect()
+                    pgen.read_alleles_list(indices[start:end], data_chunk)
+                # missing alleles will have a value of -9
+                # let's make them be -1 to be consistent with cyvcf2
+                data_chunk[data_chunk == -9] = -1
+                # transpose the GT matrix so that samples are rows and variants are
+                # columns and then cast it directly into the uint8 matrix
+                self.data[:, start:end, :2] = data_chunk.reshape(
+                    (size, mat_shape[0], 2)
+                ).transpose((1, 0, 2))
+            del data
+            gc.collect()
 
     def _iterate(
         self,
@@ -1111,37 +2032,52 @@ class GenotypesPLINK(GenotypesRefAlt):
         """
         self.log.info(f"Loading genotypes from {len(self.samples)} samples")
         Record = namedtuple("Record", "data variants")
+        rows = self._variant_rows()
 
-        # iterate over each line in the PVAR file
-        for idx, variant_arr in self._iterate_variants(region, variants):
-            # the genotypes start out as a simple 2D array with twice the number of samples
-            data = np.empty(len(self.samples) * 2, dtype=np.int32)
-            if not self._prephased:
-                phasing = np.empty(len(self.samples), dtype=np.uint8)
-                # The haplotype-major mode of read_alleles_and_phasepresent_list has
-                # not been implemented yet, so we need to read the genotypes in sample-
-                # major mode and then transpose them
-                pgen.read_alleles_and_phasepresent(idx, data, phasing)
-            else:
-                pgen.read_alleles(idx, data)
-            # missing alleles will have a value of -9
-            # let's make them be -1 to be consistent with cyvcf2
-            data[data == -9] = -1
-            # strand 1 is at even indices and strand 2 is at odd indices
-            data = np.dstack((data[::2], data[1::2]))[0].astype(np.uint8)
-            # concatenate phasing info into the data
-            if not self._prephased:
-                data = np.concatenate((data, phasing[:, np.newaxis]), axis=1)
-            # we extracted the genotypes to a matrix of size p x 3
-            # the last dimension has three items:
-            # 1) presence of REF in strand one
-            # 2) presence of REF in strand two
-            # 3) whether the genotype is phased (if self._prephased is False)
-            yield Record(data, variant_arr)
-        pgen.close()
+        try:
+            # iterate over each line in the PVAR file
+            for idx, variant in self._iterate_variants(region, variants):
+                batch, row = next(rows)
+                batch[row] = variant
+                variant_arr = batch[row]
+                # the genotypes start out as a simple 2D array with twice the number of
+                # samples
+                data = np.empty(len(self.samples) * 2, dtype=np.int32)
+                if not self._prephased:
+                    phasing = np.empty(len(self.samples), dtype=np.uint8)
+                    # The haplotype-major mode of read_alleles_and_phasepresent_list
+                    # has not been implemented yet, so we need to read the genotypes
+                    # in sample-major mode and then transpose them
+                    pgen.read_alleles_and_phasepresent(idx, data, phasing)
+                else:
+                    pgen.read_alleles(idx, data)
+                # missing alleles will have a value of -9
+                # let's make them be -1 to be consistent with cyvcf2
+                data[data == -9] = -1
+                # strand 1 is at even indices and strand 2 is at odd indices, so we can
+                # just reshape and cast the genotypes into the output row
+                gts = np.empty(
+                    (len(self.samples), (2 + (not self._prephased))), dtype=np.uint8
+                )
+                gts[:, :2] = data.reshape((len(self.samples), 2))
+                # add phasing info into the data
+                if not self._prephased:
+                    gts[:, 2] = phasing
+                data = gts
+                # we extracted the genotypes to a matrix of size p x 3
+                # the last dimension has three items:
+                # 1) presence of REF in strand one
+                # 2) presence of REF in strand two
+                # 3) whether the genotype is phased (if self._prephased is False)
+                yield Record(data, variant_arr)
+        finally:
+            pgen.close()
 
     def __iter__(
-        self, region: str = None, samples: list[str] = None, variants: set[str] = None
+        self,
+        region: str = None,
+        samples: list[str] = None,
+        variants: set[str] = None,
     ) -> Iterator[namedtuple]:
         """
         Read genotypes from a PGEN line by line without storing anything
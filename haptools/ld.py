@@ -45,6 +45,100 @@ def pearson_corr_ld(arrA: npt.NDArray, arrB: npt.NDArray) -> float:
     return np.corrcoef(arrA, arrB)[1, 0]
 
 
+# the number of bits that are set in each possible byte
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def popcount_and(arrA: npt.NDArray[np.uint8], arrB: npt.NDArray[np.uint8]) -> int:
+    """
+    Count the bits that are set in both of two bit-packed arrays
+
+    For packed genotypes (see :py:meth:`~.data.Genotypes.pack`), this is the number
+    of samples that carry both alleles
+
+    Parameters
+    ----------
+    arrA: npt.NDArray[np.uint8]
+        The first bit-packed array
+    arrB: npt.NDArray[np.uint8]
+        The second bit-packed array, with the same shape as arrA
+
+    Returns
+    -------
+    The number of bits that are set in both arrA and arrB
+    """
+    both = np.bitwise_and(arrA, arrB)
+    # numpy >= 2.0 has a popcount ufunc; otherwise, use a lookup table
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(both).sum())
+    return int(_POPCOUNT[both].sum())
+
+
+def sum_packed(arr: npt.NDArray[np.uint8]) -> tuple[int, int]:
+    """
+    Compute the sum and the sum of squares of the allele counts in a set of
+    bit-packed, phased genotypes
+
+    This is a helper function for :py:func:`~.pearson_corr_ld_packed`. It's separate
+    so that the sums for a target can be computed once and then reused.
+
+    Parameters
+    ----------
+    arr: npt.NDArray[np.uint8]
+        A 2 x ceil(n/8) array of bit-packed genotypes
+
+    Returns
+    -------
+    The sum of the allele counts and the sum of their squares
+    """
+    # count the number of ALT alleles
+    sum_x = popcount_and(arr, arr)
+    # since the alleles are 0 or 1, a sample has x^2 = x + 2*(x_1 & x_2)
+    return sum_x, sum_x + 2 * popcount_and(arr[0], arr[1])
+
+
+def pearson_corr_ld_packed(
+    arrA: npt.NDArray[np.uint8],
+    arrB: npt.NDArray[np.uint8],
+    num_samples: int,
+    sums_a: tuple[int, int] = None,
+) -> float:
+    """
+    Compute the Pearson correlation coefficient between the allele counts of two sets
+    of bit-packed, phased genotypes
+
+    This gives the same result as :py:func:`~.pearson_corr_ld` applied to the sum of
+    the two strands in each array, but every sum is computed with
+    :py:func:`~.popcount_and`, so the genotypes never need to be unpacked
+
+    Parameters
+    ----------
+    arrA: npt.NDArray[np.uint8]
+        The first 2 x ceil(n/8) array of bit-packed genotypes
+    arrB: npt.NDArray[np.uint8]
+        The second 2 x ceil(n/8) array of bit-packed genotypes
+    num_samples: int
+        The number of samples (n) in each of the arrays
+    sums_a: tuple[int, int], optional
+        The output of :py:func:`~.sum_packed` for arrA, if it has already been
+        computed
+
+    Returns
+    -------
+    The LD between the genotypes in arrA and the genotypes in arrB
+    """
+    sum_a, sum_aa = sum_packed(arrA) if sums_a is None else sums_a
+    sum_b, sum_bb = sum_packed(arrB)
+    # x * y expands into the four strand-by-strand products
+    sum_ab = sum(popcount_and(arrA[i], arrB[j]) for i in range(2) for j in range(2))
+    cov = num_samples * sum_ab - sum_a * sum_b
+    var_a = num_samples * sum_aa - sum_a**2
+    var_b = num_samples * sum_bb - sum_b**2
+    if var_a == 0 or var_b == 0:
+        return np.nan
+    return cov / np.sqrt(float(var_a) * var_b)
+
+
 def calc_ld(
     target: str,
     genotypes: Path,
@@ -185,24 +279,33 @@ def calc_ld(
 
     log.info("Obtaining target genotypes")
     if isinstance(target, data.Haplotype):
-        target_gts = target.transform(gt).sum(axis=1)
+        target_gts = target.transform(gt)
         if from_gts and ids is not None:
             gt.subset(variants=ids_tup, inplace=True)
     else:
-        target_gts = gt.subset(variants=(target,)).data[:, 0, :2].sum(axis=1)
+        target_gts = gt.subset(variants=(target,)).data[:, 0, :2]
 
     if from_gts:
         log.info("Computing LD between genotypes and the target")
+        # pack the genotypes into bits, so that each correlation is just a handful of
+        # popcounts over an eighth of the memory
+        num_samples = len(gt.samples)
+        # lay out the packed genotypes so that those of each variant are contiguous
+        variants_gts = np.ascontiguousarray(gt.pack().transpose((1, 2, 0)))
+        target_gts = np.packbits(target_gts.T, axis=1)
+        target_sums = sum_packed(target_gts)
         with data.Data.hook_compressed(output, mode="w") as ld_file:
             log.info("Outputting .ld file with LD values")
             ld_file.write("CHR\tBP\tSNP\tR\n")
             for idx, variant in enumerate(gt.variants[["chrom", "pos", "id"]]):
                 var_chr, var_bp, var_snp = variant
-                variant_gts = gt.data[:, idx, :2].sum(axis=1)
-                variant_ld = pearson_corr_ld(target_gts, variant_gts)
+                variant_ld = pearson_corr_ld_packed(
+                    target_gts, variants_gts[idx], num_samples, target_sums
+                )
                 ld_file.write(f"{var_chr}\t{var_bp}\t{var_snp}\t{variant_ld:.3f}\n")
     else:
         log.info("Computing LD between haplotypes and the target")
+        target_gts = target_gts.sum(axis=1)
         # construct a new Haplotypes object that also stores the LD values
         hp_out = data.Haplotypes(fname=output, haplotype=Haplotype, log=log)
         hp_out.data = {}
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import logging
 from pathlib import Path
+from contextlib import closing
 from collections import namedtuple
 from dataclasses import dataclass, field
 
@@ -182,45 +183,49 @@ class GenotypesAncestry(data.GenotypesRefAlt):
         # goes from encoding number to population code
         self.popnum_ancestry = {}
 
-    def _iterate(self, vcf: VCF, region: str = None, variants: set[str] = None):
+    def _iterate(
+        self,
+        vcf: VCF,
+        region: str = None,
+        variants: set[str] = None,
+        exclude_multiallelic: bool = False,
+        min_maf: float = None,
+    ):
         """
         See documentation for :py:meth:`~.Genotypes._iterate`
         """
         self.log.info(f"Loading genotypes from {len(self.samples)} samples")
         Record = namedtuple("Record", "data ancestry variants")
-        num_seen = 0
+        rows = self._variant_rows()
         pop_count = 0
-        # iterate over each line in the VCF
-        # note, this can take a lot of time if there are many samples
-        for variant in vcf(region):
-            if variants is not None and variant.ID not in variants:
-                if num_seen >= len(variants):
-                    # exit early if we've already found all the variants
-                    break
-                continue
-            # save meta information about each variant
-            variant_arr = self._variant_arr(variant)
-            # extract the genotypes to a matrix of size n x 3
-            # the last dimension has three items:
-            # 1) presence of REF in strand one
-            # 2) presence of REF in strand two
-            # 3) whether the genotype is phased (if self._prephased is False)
-            data = np.array(variant.genotypes, dtype=np.uint8)
-            data = data[:, : (2 + (not self._prephased))]
-            # also extract the ancestral population of each variant in each individual
-            ancestry = np.empty((data.shape[0], 2), dtype=np.uint8)
-            for i, sample in enumerate(variant.format("POP")):
-                pops = sample.split(",")
-                for pop in pops:
-                    if pop not in self.ancestry_labels:
-                        self.ancestry_labels[pop] = pop_count
-                        self.popnum_ancestry[pop_count] = pop
-                        pop_count += 1
-                ancestry[i] = tuple(map(self.ancestry_labels.get, pops))
-            # finally, output everything
-            yield Record(data, ancestry, variant_arr)
-            num_seen += 1
-        vcf.close()
+        records = self._iterate_records(
+            vcf, region, variants, exclude_multiallelic, min_maf
+        )
+        # close the records explicitly, in case we're closed before they're exhausted
+        with closing(records):
+            for variant in records:
+                # save meta information about each variant
+                batch, row = next(rows)
+                batch[row] = self._variant_arr(variant)
+                variant_arr = batch[row]
+                # extract the genotypes to a matrix of size n x 3
+                # the last dimension has three items:
+                # 1) presence of REF in strand one
+                # 2) presence of REF in strand two
+                # 3) whether the genotype is phased (if self._prephased is False)
+                data = self._genotype_arr(variant)
+                # also extract the ancestral population of each variant in each sample
+                ancestry = np.empty((data.shape[0], 2), dtype=np.uint8)
+                for i, sample in enumerate(variant.format("POP")):
+                    pops = sample.split(",")
+                    for pop in pops:
+                        if pop not in self.ancestry_labels:
+                            self.ancestry_labels[pop] = pop_count
+                            self.popnum_ancestry[pop_count] = pop
+                            pop_count += 1
+                    ancestry[i] = tuple(map(self.ancestry_labels.get, pops))
+                # finally, output everything
+                yield Record(data, ancestry, variant_arr)
 
     def read(
         self,
@@ -228,74 +233,92 @@ class GenotypesAncestry(data.GenotypesRefAlt):
         samples: list[str] = None,
         variants: set[str] = None,
         max_variants: int = None,
+        exclude_multiallelic: bool = False,
+        min_maf: float = None,
     ):
         """
         See documentation for :py:meth:`~.Genotypes.read`
         """
         super(data.Genotypes, self).read()
-        records = self.__iter__(region=region, samples=samples, variants=variants)
+        records = self.__iter__(
+            region=region,
+            samples=samples,
+            variants=variants,
+            exclude_multiallelic=exclude_multiallelic,
+            min_maf=min_maf,
+        )
         if variants is not None:
             max_variants = len(variants)
-        # check whether we can preallocate memory instead of making copies
-        if max_variants is None:
-            self.log.warning(
-                "The max_variants parameter was not specified. We have no choice but to"
-                " append to an ever-growing array, which can lead to memory overuse!"
-            )
-            variants_arr = []
-            data_arr = []
-            ancestry_arr = []
-            for rec in records:
-                variants_arr.append(rec.variants)
-                data_arr.append(rec.data)
-                ancestry_arr.append(rec.ancestry)
-            self.log.info(f"Copying {len(variants_arr)} variants into np arrays.")
-            # convert to np array for speedy operations later on
-            self.variants = np.array(variants_arr, dtype=self.variants.dtype)
-            self.data = np.array(data_arr, dtype=np.uint8)
-            self.ancestry = np.array(ancestry_arr, dtype=np.uint8)
-        else:
-            # preallocate arrays! this will save us lots of memory and speed b/c
-            # appends can sometimes make copies
-            self.variants = np.empty((max_variants,), dtype=self.variants.dtype)
-            # in order to check_phase() later, we must store the phase info, as well
-            self.data = np.empty(
-                (max_variants, len(self.samples), (2 + (not self._prephased))),
-                dtype=np.uint8,
-            )
-            self.ancestry = np.empty(
-                (max_variants, len(self.samples), 2),
-                dtype=np.uint8,
-            )
-            self.valid_labels = np.empty(
-                (max_variants, len(self.samples), 2),
-                dtype=object,
+        elif max_variants is None:
+            max_variants = self._count_variants(region, exclude_multiallelic)
+        # preallocate arrays! this will save us lots of memory and speed b/c
+        # appends can sometimes make copies
+        self.variants = np.empty((max_variants,), dtype=self.variants.dtype)
+        # in order to check_phase() later, we must store the phase info, as well
+        # samples are rows and variants are columns, so we fill in one column at a time
+        self.data = np.empty(
+            (len(self.samples), max_variants, (2 + (not self._prephased))),
+            dtype=np.uint8,
+        )
+        self.ancestry = np.empty(
+            (len(self.samples), max_variants, 2),
+            dtype=np.uint8,
+        )
+        num_seen = 0
+        for rec in records:
+            if num_seen >= max_variants:
+                break
+            self.variants[num_seen] = rec.variants
+            self.data[:, num_seen] = rec.data
+            self.ancestry[:, num_seen] = rec.ancestry
+            num_seen += 1
+        if max_variants > num_seen:
+            self.log.info(
+                f"Removing {max_variants-num_seen} unneeded variant records that "
+                "were preallocated."
             )
-            num_seen = 0
-            for rec in records:
-                if num_seen >= max_variants:
-                    break
-                self.variants[num_seen] = rec.variants
-                self.data[num_seen] = rec.data
-                self.ancestry[num_seen] = rec.ancestry
-                num_seen += 1
-            if max_variants > num_seen:
-                self.log.info(
-                    f"Removing {max_variants-num_seen} unneeded variant records that "
-                    "were preallocated b/c max_variants was specified."
-                )
-                self.variants = self.variants[:num_seen]
-                self.data = self.data[:num_seen]
-                self.ancestry = self.ancestry[:num_seen]
+            self.variants = self.variants[:num_seen]
+            # copy the columns we need so that the matrices stay contiguous
+            self.data = np.ascontiguousarray(self.data[:, :num_seen])
+            self.ancestry = np.ascontiguousarray(self.ancestry[:, :num_seen])
         if 0 in self.data.shape:
             self.log.warning(
                 "Failed to load genotypes. If you specified a region, check that the"
                 " contig name matches! For example, double-check the 'chr' prefix."
             )
-        # transpose the GT matrix so that samples are rows and variants are columns
-        self.log.info(f"Transposing genotype matrix of size {self.data.shape}.")
-        self.data = self.data.transpose((1, 0, 2))
-        self.ancestry = self.ancestry.transpose((1, 0, 2))
+
+    def _split_region(self, region: str = None, num_chunks: int = 1) -> list[tuple]:
+        """
+        See documentation for :py:meth:`~.Genotypes._split_region`
+
+        The ancestry array isn't merged across sub-regions, so the region is never
+        split
+        """
+        return [(region, 0)]
+
+    def _cache_arrays(self) -> dict[str, npt.NDArray]:
+        """
+        See documentation for :py:meth:`~.Genotypes._cache_arrays`
+
+        The ancestry array and the population labels are cached, as well
+        """
+        arrays = super()._cache_arrays()
+        arrays["ancestry"] = self.ancestry
+        # the labels are stored in the order of their encoding numbers
+        arrays["ancestry_labels"] = np.array(
+            [self.popnum_ancestry[num] for num in range(len(self.popnum_ancestry))],
+            dtype=str,
+        )
+        return arrays
+
+    def _restore_cache_arrays(self, arrays: dict[str, npt.NDArray]):
+        """
+        See documentation for :py:meth:`~.Genotypes._restore_cache_arrays`
+        """
+        super()._restore_cache_arrays(arrays)
+        self.ancestry = arrays["ancestry"]
+        self.popnum_ancestry = dict(enumerate(arrays["ancestry_labels"].tolist()))
+        self.ancestry_labels = {pop: num for num, pop in self.popnum_ancestry.items()}
 
     def subset(
         self,
@@ -389,8 +412,8 @@ class GenotypesAncestry(data.GenotypesRefAlt):
             return
         # check: are there any variants that have genotype values above 1?
         # A genotype value above 1 would imply the variant has more than one ALT allele
-        multiallelic = np.any(self.data[:, :, :2] > 1, axis=2)
-        if np.any(multiallelic):
+        multiallelic = self._find_multiallelic()
+        if multiallelic is not None:
             samp_idx, variant_idx = np.nonzero(multiallelic)
             if discard_also:
                 self.log.info(f"Ignoring {len(variant_idx)} multiallelic variants")
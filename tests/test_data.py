@@ -103,6 +103,11 @@ class TestGenotypes:
             == "Variant with ID 1:10116:A:G at POS 1:10116 is unphased for sample"
             " HG00097"
         )
+        # we should get the same error if we check one sample at a time
+        gts._block_size = 1
+        with pytest.raises(ValueError) as info:
+            gts.check_phase()
+        assert str(info.value).endswith("is unphased for sample HG00097")
         gts.data[1, 1, 2] = 1
 
         # check phase and remove the phase axis
@@ -157,6 +162,12 @@ class TestGenotypes:
             np.testing.assert_allclose(line.data, expected[idx])
         assert gts.samples == samples
 
+        # the variants of earlier records shouldn't change as we keep iterating
+        lines = list(gts.__iter__())
+        gts.read()
+        for idx, line in enumerate(lines):
+            assert line.variants == gts.variants[idx]
+
     def test_load_genotypes_discard_multiallelic(self):
         gts = self._get_fake_genotypes()
 
@@ -173,6 +184,13 @@ class TestGenotypes:
         np.testing.assert_equal(gts.data, data_copy_without_biallelic)
         assert gts.variants.shape == tuple(variant_shape)
 
+        # the alleles of each genotype aren't adjacent in a Fortran-ordered array
+        gts = self._get_fake_genotypes()
+        gts.data = np.asfortranarray(gts.data)
+        gts.data[1, 1, 1] = 2
+        gts.check_biallelic(discard_also=True)
+        np.testing.assert_equal(gts.data, data_copy_without_biallelic)
+
     def test_load_genotypes_subset(self):
         expected = self._get_expected_genotypes()
 
@@ -204,6 +222,162 @@ class TestGenotypes:
         np.testing.assert_allclose(gts.data, expected)
         assert gts.samples == tuple(samples)
 
+    def test_load_genotypes_max_variants(self):
+        expected = self._get_expected_genotypes()
+
+        # can we count the variants before loading them?
+        gts = Genotypes(DATADIR.joinpath("simple.vcf.gz"))
+        assert gts._count_variants() == 4
+        assert gts._count_variants(region="1:10115-10117") == 2
+
+        # the arrays should be trimmed if we overestimate the number of variants
+        gts = Genotypes(DATADIR.joinpath("simple.vcf.gz"))
+        gts.read(max_variants=10)
+        np.testing.assert_allclose(gts.data, expected)
+        assert gts.data.flags["C_CONTIGUOUS"]
+        assert len(gts.variants) == 4
+
+    def test_load_genotypes_parallel(self):
+        expected = Genotypes.load(DATADIR.joinpath("apoe.vcf.gz"))
+
+        # the region should be split into sub-regions that are read separately
+        region = "19:45411941-45412079"
+        gts = Genotypes(DATADIR.joinpath("apoe.vcf.gz"))
+        assert len(gts._split_region(region, 2)) == 2
+        # commas are allowed in the coordinates, just like in htslib
+        assert gts._split_region("19:45,411,941-45,412,079", 2) == gts._split_region(
+            region, 2
+        )
+        # regions that can't be parsed should be read serially
+        assert gts._split_region("19:abc", 2) == [("19:abc", 0)]
+
+        # the genotypes should be the same as if we had read them serially
+        gts = Genotypes.load(DATADIR.joinpath("apoe.vcf.gz"), region=region, n_jobs=2)
+        np.testing.assert_allclose(gts.data, expected.data)
+        assert np.array_equal(gts.variants, expected.variants)
+        assert gts.samples == expected.samples
+
+        region = "19:45,411,941-45,412,079"
+        gts = Genotypes.load(DATADIR.joinpath("apoe.vcf.gz"), region=region, n_jobs=2)
+        np.testing.assert_allclose(gts.data, expected.data)
+
+        # regions that end before they start should be read serially, too
+        region = "19:45412079-45411941"
+        assert gts._split_region(region, 2) == [(region, 0)]
+        gts = Genotypes.load(DATADIR.joinpath("apoe.vcf.gz"), region=region, n_jobs=2)
+        assert len(gts.variants) == 0
+
+    def test_load_genotypes_filter(self):
+        expected = self._get_expected_genotypes()
+
+        # only the second variant has an MAF above 0.1
+        gts = Genotypes(DATADIR.joinpath("simple.vcf"))
+        gts.read(min_maf=0.1)
+        np.testing.assert_allclose(gts.data, expected[:, [1]])
+        assert tuple(gts.variants["id"]) == ("1:10116:A:G",)
+
+        # make the third variant multiallelic and check that it gets skipped
+        tmp_file = Path("simple-multiallelic.vcf")
+        with open(DATADIR.joinpath("simple.vcf")) as vcf:
+            lines = vcf.read().replace("\tC\tA\t", "\tC\tA,T\t")
+        with open(tmp_file, "w") as vcf:
+            vcf.write(lines)
+        gts = Genotypes(tmp_file)
+        # the multiallelic variant shouldn't be counted when preallocating the arrays
+        assert gts._count_variants(exclude_multiallelic=True) == 3
+        gts.read(exclude_multiallelic=True)
+        np.testing.assert_allclose(gts.data, expected[:, [0, 1, 3]])
+        assert "1:10117:C:A" not in gts.variants["id"]
+
+        tmp_file.unlink()
+
+    def test_load_genotypes_cache(self):
+        expected = Genotypes.load(DATADIR.joinpath("simple.vcf"))
+
+        # copy the VCF somewhere else, so that the cache files don't appear in DATADIR
+        tmp_file = Path("simple-cache.vcf")
+        tmp_file.write_text(DATADIR.joinpath("simple.vcf").read_text())
+        cache_files = (Path(f"{tmp_file}.gts.npy"), Path(f"{tmp_file}.gts.npz"))
+
+        # the first load should create the cache and the second should use it
+        gts = Genotypes.load(tmp_file, cache=True)
+        assert all(cache_file.exists() for cache_file in cache_files)
+        gts = Genotypes.load(tmp_file, cache=True)
+        assert isinstance(gts.data, np.memmap)
+        np.testing.assert_allclose(gts.data, expected.data)
+        assert np.array_equal(gts.variants, expected.variants)
+        assert gts.samples == expected.samples
+
+        # the cache should be ignored if we ask for something different
+        samples = ["HG00097", "HG00100"]
+        gts = Genotypes.load(tmp_file, samples=samples, cache=True)
+        assert not isinstance(gts.data, np.memmap)
+        assert gts.samples == tuple(samples)
+
+        # the cache can be loaded without unpickling anything
+        with np.load(cache_files[1], allow_pickle=False) as meta:
+            assert tuple(meta["samples"]) == tuple(samples)
+
+        # the cache should be ignored if its data doesn't match its metadata
+        np.save(cache_files[0], expected.data)
+        gts = Genotypes.load(tmp_file, samples=samples, cache=True)
+        assert not isinstance(gts.data, np.memmap)
+        assert gts.data.shape[0] == len(samples)
+
+        tmp_file.unlink()
+        for cache_file in cache_files:
+            cache_file.unlink()
+
+    def test_load_genotypes_compact(self):
+        expected = self._get_expected_genotypes()
+
+        gts = Genotypes(DATADIR.joinpath("simple.vcf"))
+        compact = gts.read_compact()
+        np.testing.assert_equal(compact.data, expected[:, :, :2].sum(axis=2))
+        np.testing.assert_equal(compact.phased, expected[:, :, 2])
+        assert compact.samples == (
+            "HG00096",
+            "HG00097",
+            "HG00099",
+            "HG00100",
+            "HG00101",
+        )
+        assert tuple(compact.variants["id"]) == (
+            "1:10114:T:C",
+            "1:10116:A:G",
+            "1:10117:C:A",
+            "1:10122:A:G",
+        )
+        # the properties of the object should be left alone
+        assert gts.data is None
+        assert len(gts.samples) == 0
+
+        # we should stop once we've found the requested variants
+        compact = gts.read_compact(variants={"1:10116:A:G"})
+        np.testing.assert_equal(compact.data, expected[:, [1], :2].sum(axis=2))
+        assert tuple(compact.variants["id"]) == ("1:10116:A:G",)
+
+        # it shouldn't clobber genotypes that were already loaded
+        gts.read()
+        gts.read_compact(samples=["HG00097"])
+        np.testing.assert_allclose(gts.data, expected)
+        gts.check_missing()
+
+    def test_pack_genotypes(self):
+        gts = self._get_fake_genotypes()
+
+        # genotypes must be biallelic before they can be packed
+        with pytest.raises(ValueError):
+            gts.pack()
+        gts.check_biallelic()
+
+        # five samples should fit into a single byte
+        packed = gts.pack()
+        assert packed.dtype == np.uint8
+        assert packed.shape == (1, 4, 2)
+        for idx in range(len(gts.variants)):
+            np.testing.assert_equal(gts.unpack_variant(packed, idx), gts.data[:, idx])
+
     def test_subset_genotypes(self):
         gts = self._get_fake_genotypes()
 
@@ -316,6 +490,12 @@ class TestGenotypesPLINK:
             for col in ("chrom", "pos", "id", "ref", "alt"):
                 assert gts.variants[col][i] == expected.variants[col][i]
 
+        # what if the last chunk is smaller than the others?
+        gts = GenotypesPLINK(DATADIR.joinpath("simple.pgen"), chunk_size=3)
+        gts.read()
+        gts.check_phase()
+        np.testing.assert_allclose(gts.data, expected.data)
+
     def test_load_genotypes_prephased(self):
         expected = self._get_fake_genotypes_plink()
 
@@ -330,6 +510,26 @@ class TestGenotypesPLINK:
             for col in ("chrom", "pos", "id", "ref", "alt"):
                 assert gts.variants[col][i] == expected.variants[col][i]
 
+    def test_load_genotypes_compact(self):
+        expected = Genotypes(DATADIR.joinpath("simple.vcf")).read_compact()
+
+        gts = GenotypesPLINK(DATADIR.joinpath("simple.pgen"), chunk_size=3)
+        compact = gts.read_compact()
+        np.testing.assert_equal(compact.data, expected.data)
+        np.testing.assert_equal(compact.phased, expected.phased)
+        assert compact.samples == expected.samples
+        assert tuple(compact.variants["id"]) == tuple(expected.variants["id"])
+        # the properties of the object should be left alone
+        assert gts.data is None
+        assert len(gts.samples) == 0
+
+        # can we subset the samples and variants?
+        samples = ["HG00097", "HG00100"]
+        compact = gts.read_compact(samples=samples, variants={"1:10116:A:G"})
+        np.testing.assert_equal(compact.data, expected.data[[1, 3]][:, [1]])
+        assert compact.samples == tuple(samples)
+        assert tuple(compact.variants["id"]) == ("1:10116:A:G",)
+
     def test_load_genotypes_iterate(self):
         expected = self._get_fake_genotypes_plink()
 
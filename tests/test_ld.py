@@ -5,6 +5,12 @@ from click.testing import CliRunner
 
 from haptools.data import Data
 from haptools.__main__ import main
+from haptools.ld import (
+    sum_packed,
+    popcount_and,
+    pearson_corr_ld,
+    pearson_corr_ld_packed,
+)
 
 DATADIR = Path(__file__).parent.joinpath("data")
 
@@ -94,3 +100,28 @@ def test_from_gts_ids(capfd):
     captured = capfd.readouterr()
     assert captured.out == expected
     assert result.exit_code == 0
+
+
+def test_popcount_and():
+    arrA = np.random.default_rng(0).integers(2, size=(100, 2)).astype(np.bool_)
+    arrB = np.random.default_rng(1).integers(2, size=(100, 2)).astype(np.bool_)
+    expected = np.sum(arrA & arrB)
+
+    assert (
+        popcount_and(np.packbits(arrA, axis=0), np.packbits(arrB, axis=0)) == expected
+    )
+
+
+def test_pearson_corr_ld_packed():
+    arrA = np.random.default_rng(0).integers(2, size=(100, 2)).astype(np.bool_)
+    arrB = np.random.default_rng(1).integers(2, size=(100, 2)).astype(np.bool_)
+    expected = pearson_corr_ld(arrA.sum(axis=1), arrB.sum(axis=1))
+
+    packedA, packedB = np.packbits(arrA.T, axis=1), np.packbits(arrB.T, axis=1)
+    assert np.isclose(pearson_corr_ld_packed(packedA, packedB, 100), expected)
+    # the sums for arrA can be computed ahead of time
+    sums_a = sum_packed(packedA)
+    assert np.isclose(pearson_corr_ld_packed(packedA, packedB, 100, sums_a), expected)
+    # a variant without any variance has an undefined correlation
+    packedB[:] = 0
+    assert np.isnan(pearson_corr_ld_packed(packedA, packedB, 100))
@@ -58,6 +58,30 @@ class TestGenotypesAncestry:
         assert gts.ancestry_labels == expected.ancestry_labels
         np.testing.assert_allclose(gts.ancestry, expected.ancestry)
         assert gts.samples == expected.samples
+        # the VCF doesn't have any SAMPLE fields, so the labels stay unset
+        assert gts.valid_labels is None
+
+    def test_load_genotypes_ancestry_cache(self):
+        expected = GenotypesAncestry.load(self.file)
+
+        # copy the VCF somewhere else, so that the cache files don't appear in DATADIR
+        tmp_file = Path("simple-ancestry-cache.vcf")
+        tmp_file.write_text(self.file.read_text())
+        cache_files = (Path(f"{tmp_file}.gts.npy"), Path(f"{tmp_file}.gts.npz"))
+
+        # the ancestry should be restored from the cache, along with the genotypes
+        GenotypesAncestry.load(tmp_file, cache=True)
+        gts = GenotypesAncestry.load(tmp_file, cache=True)
+        assert isinstance(gts.data, np.memmap)
+        np.testing.assert_allclose(gts.data, expected.data)
+        np.testing.assert_allclose(gts.ancestry, expected.ancestry)
+        assert gts.ancestry_labels == expected.ancestry_labels
+        assert gts.popnum_ancestry == {0: "YRI", 1: "CEU", 2: "ASW"}
+        assert gts.samples == expected.samples
+
+        tmp_file.unlink()
+        for cache_file in cache_files:
+            cache_file.unlink()
 
     def test_load_genotypes_iterate(self, caplog):
         expected = self._get_expected_ancestry().transpose((1, 0, 2))